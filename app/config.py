@@ -19,17 +19,51 @@ class Settings:
     # ChromaDB settings
     chroma_db_path: str = os.getenv("CHROMA_DB_PATH", "data/chroma_db")
 
-    # Embedding model (must be all-MiniLM-L6-v2 per spec)
+    # Embedding model (must be all-MiniLM-L6-v2 per spec). For CPU-bound
+    # deployments where accuracy allows, paraphrase-MiniLM-L3-v2 (3 layers
+    # instead of 6, same 384 dimensions) roughly halves inference time.
+    # Changing the model requires re-ingesting the documents.
     embedding_model_name: str = os.getenv(
         "EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2"
     )
 
+    # Batch size used when encoding several texts at once
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+    # Intra-op threads used by torch for CPU inference; 0 keeps torch's default
+    torch_num_threads: int = int(os.getenv("TORCH_NUM_THREADS", "0"))
+
+    # Embedding backend: "torch" (SentenceTransformer, default) or "onnx_int8"
+    # (int8-quantized ONNX Runtime on CPU, needs optimum[onnxruntime])
+    embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    onnx_model_dir: str = os.getenv("ONNX_MODEL_DIR", "data/onnx_models")
+
+    # Compile the torch embedding model with torch.compile (PyTorch >= 2.0)
+    embedding_compile: bool = os.getenv("EMBEDDING_COMPILE", "false").lower() == "true"
+
+    # Number of query embeddings kept in the in-process LRU cache
+    embedding_cache_size: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+
+    # SQLite cache of document embeddings keyed by text hash (empty disables it)
+    embedding_cache_db: str = os.getenv("EMBEDDING_CACHE_DB", "data/embedding_cache.db")
+    # Storage precision of cached document embeddings: "float32" or "float16"
+    embedding_cache_dtype: str = os.getenv("EMBEDDING_CACHE_DTYPE", "float32").lower()
+
+    # Skip ingested documents whose cosine similarity to an already stored
+    # (or earlier in the same batch) document exceeds this threshold, e.g. 0.95.
+    # 0 disables near-duplicate detection.
+    dedup_threshold: float = float(os.getenv("DEDUP_THRESHOLD", "0"))
+
     # Search parameters (Top K = 3 per spec)
     top_k: int = 3
 
     # Gemini API Configuration for LLM-based query and response reformulation
     gemini_api_key: str = os.getenv("GEMINI_API_KEY", "")
 
+    # Cache for Gemini query enhancements and reformulations (entries, seconds)
+    gemini_cache_size: int = int(os.getenv("GEMINI_CACHE_SIZE", "1024"))
+    gemini_cache_ttl: int = int(os.getenv("GEMINI_CACHE_TTL", "3600"))
+
 
 settings = Settings()
 
@@ -1,6 +1,7 @@
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
 import chromadb
+import numpy as np
 from chromadb.config import Settings as ChromaSettings
 
 from .config import settings
@@ -27,12 +28,37 @@ class BaseDatabase:
         """Search for similar documents using embedding."""
         raise NotImplementedError
 
+    def search_batch(
+        self, query_embeddings: List[List[float]], top_k: int = 3
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for similar documents for several embeddings at once."""
+        raise NotImplementedError
+
     def add_document(
-        self, doc_id: str, text: str, embedding: Optional[List[float]] = None, metadata: Optional[Dict[str, Any]] = None
+        self, doc_id: str, text: str, embedding: List[float], metadata: Optional[Dict[str, Any]] = None
     ) -> None:
         """Add a document to the vector store."""
         raise NotImplementedError
 
+    def add_documents(
+        self,
+        doc_ids: List[str],
+        texts: List[str],
+        embeddings: np.ndarray,
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """Add a batch of documents to the vector store."""
+        raise NotImplementedError
+
+    def max_similarity(
+        self, query_embeddings: np.ndarray, exclude_ids: List[str]
+    ) -> np.ndarray:
+        """
+        Return, for each query embedding, the similarity of its nearest stored
+        document whose id is not in exclude_ids (-1 when there is none).
+        """
+        raise NotImplementedError
+
     def get_collection_count(self) -> int:
         """Get the number of documents in the collection."""
         raise NotImplementedError
@@ -57,13 +83,21 @@ class ChromaDatabase(BaseDatabase):
                     allow_reset=True,
                 ),
             )
+            # Embeddings are L2-normalized at encode time, so inner product
+            # equals cosine similarity without HNSW recomputing norms.
+            # Embeddings are always computed by our own cached model, so no
+            # embedding function is attached (Chroma would load a second MiniLM).
             self._collection = self._client.get_or_create_collection(
                 name="semantic_search",
-                metadata={"hnsw:space": "cosine"},
+                metadata={"hnsw:space": "ip"},
+                embedding_function=None,
             )
+            # Collections created before the switch to "ip" keep their original space
+            self._space = (self._collection.metadata or {}).get("hnsw:space", "l2")
             logger.info(
-                "ChromaDB initialized at %s with collection 'semantic_search'",
+                "ChromaDB initialized at %s with collection 'semantic_search' (%s space)",
                 settings.chroma_db_path,
+                self._space,
             )
         except Exception as exc:
             logger.exception("Failed to initialize ChromaDB")
@@ -85,49 +119,91 @@ class ChromaDatabase(BaseDatabase):
             # Format results to match the expected schema
             formatted_results = []
             if results["ids"] and len(results["ids"]) > 0:
-                for idx, (doc_id, distance, metadata_item, document) in enumerate(
-                    zip(
-                        results["ids"][0],
-                        results["distances"][0],
-                        results["metadatas"][0],
-                        results["documents"][0],
-                    )
-                ):
-                    # ChromaDB distances are L2 by default, convert to cosine similarity
-                    # For cosine distance, similarity = 1 - distance
-                    similarity_score = 1.0 - (distance / 2.0)  # Normalize
-                    similarity_score = max(0.0, min(1.0, similarity_score))  # Clamp to [0, 1]
-                    
-                    formatted_results.append({
-                        "id": idx + 1,
-                        "doc_id": doc_id,
-                        "text": document,
-                        "score": similarity_score,
-                        "metadata": metadata_item,
-                    })
+                formatted_results = self._format_results(results, 0, self._space)
             
-            logger.info("ChromaDB search returned %d results", len(formatted_results))
+            logger.debug("ChromaDB search returned %d results", len(formatted_results))
             return formatted_results
         except Exception as exc:
             logger.exception("ChromaDB search failed")
             raise DatabaseError("Database search failed") from exc
 
+    def search_batch(
+        self, query_embeddings: List[List[float]], top_k: int = 3
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several query embeddings with a single ChromaDB query.
+        Returns one list of top_k results per query, in input order.
+        """
+        if not query_embeddings:
+            return []
+
+        try:
+            results = self._collection.query(
+                query_embeddings=query_embeddings,
+                n_results=top_k,
+            )
+            batch_results = [
+                self._format_results(results, i, self._space)
+                for i in range(len(results["ids"]))
+            ]
+            logger.debug("ChromaDB batch search answered %d queries", len(batch_results))
+            return batch_results
+        except Exception as exc:
+            logger.exception("ChromaDB batch search failed")
+            raise DatabaseError("Database search failed") from exc
+
+    @staticmethod
+    def _to_similarities(distances: List[float], space: str) -> np.ndarray:
+        """Convert ChromaDB distances to cosine similarities for the collection's space."""
+        distances = np.asarray(distances, dtype=np.float32)
+        if space == "l2":
+            # Squared L2 distance between unit vectors is 2 - 2 * cosine
+            return 1.0 - distances / 2.0
+        # "cosine" distance is 1 - cosine and "ip" distance is 1 - dot,
+        # which equals 1 - cosine on normalized vectors
+        return 1.0 - distances
+
+    @staticmethod
+    def _format_results(
+        results: Dict[str, Any], query_index: int, space: str
+    ) -> List[Dict[str, Any]]:
+        """Format the results of one query in a ChromaDB response."""
+        similarities = ChromaDatabase._to_similarities(results["distances"][query_index], space)
+        scores = np.clip(similarities, 0.0, 1.0).tolist()  # Clamp to [0, 1]
+
+        return [
+            {
+                "id": idx,
+                "doc_id": doc_id,
+                "text": document,
+                "score": score,
+                "metadata": metadata_item,
+            }
+            for idx, (doc_id, score, metadata_item, document) in enumerate(
+                zip(
+                    results["ids"][query_index],
+                    scores,
+                    results["metadatas"][query_index],
+                    results["documents"][query_index],
+                ),
+                start=1,
+            )
+        ]
+
     def add_document(
-        self, doc_id: str, text: str, embedding: Optional[List[float]] = None, metadata: Optional[Dict[str, Any]] = None
+        self, doc_id: str, text: str, embedding: List[float], metadata: Optional[Dict[str, Any]] = None
     ) -> None:
         """
-        Add a document to ChromaDB.
-        If embedding is not provided, it will be generated during upsert.
+        Add a document to ChromaDB with its precomputed embedding.
         """
         try:
             if metadata is None:
                 metadata = {}
             
-            # ChromaDB will auto-generate embeddings if not provided
             self._collection.upsert(
                 ids=[doc_id],
                 documents=[text],
-                embeddings=[embedding] if embedding else None,
+                embeddings=[embedding],
                 metadatas=[metadata],
             )
             logger.info("Document %s added to ChromaDB", doc_id)
@@ -135,22 +211,87 @@ class ChromaDatabase(BaseDatabase):
             logger.exception("Failed to add document to ChromaDB")
             raise DatabaseError("Failed to add document") from exc
 
+    def add_documents(
+        self,
+        doc_ids: List[str],
+        texts: List[str],
+        embeddings: np.ndarray,
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Add a batch of documents to ChromaDB with as few upserts as possible.
+        Batches larger than the client's maximum batch size are split.
+        ChromaDB 0.5 only accepts embeddings as lists, so the (n, dim) array is
+        converted here, per upsert chunk, with a single C-level tolist().
+        """
+        try:
+            max_batch_size = self._client.get_max_batch_size()
+            for start in range(0, len(doc_ids), max_batch_size):
+                end = start + max_batch_size
+                self._collection.upsert(
+                    ids=doc_ids[start:end],
+                    documents=texts[start:end],
+                    embeddings=embeddings[start:end].tolist(),
+                    metadatas=metadatas[start:end],
+                )
+            logger.info("%d documents added to ChromaDB", len(doc_ids))
+        except Exception as exc:
+            logger.exception("Failed to add documents to ChromaDB")
+            raise DatabaseError("Failed to add documents") from exc
+
+    def max_similarity(
+        self, query_embeddings: np.ndarray, exclude_ids: List[str]
+    ) -> np.ndarray:
+        """
+        Return, for each query embedding, the similarity of its nearest stored
+        document whose id is not in exclude_ids (-1 when there is none).
+        Uses the HNSW index: each query asks for one neighbour plus one per
+        excluded id already stored, so an excluded hit never hides the nearest
+        remaining document.
+        """
+        best = np.full(len(query_embeddings), -1.0, dtype=np.float32)
+        try:
+            count = self._collection.count()
+            if count == 0 or len(query_embeddings) == 0:
+                return best
+
+            excluded = set(exclude_ids)
+            stored_excluded = 0
+            if excluded:
+                stored_excluded = len(self._collection.get(ids=list(excluded), include=[])["ids"])
+            n_results = min(1 + stored_excluded, count)
+            if n_results <= stored_excluded:
+                # Every stored document is being replaced
+                return best
+
+            results = self._collection.query(
+                query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
+                n_results=n_results,
+                include=["distances"],
+            )
+            for i, (ids, distances) in enumerate(zip(results["ids"], results["distances"])):
+                similarities = self._to_similarities(distances, self._space)
+                for doc_id, similarity in zip(ids, similarities):
+                    if doc_id not in excluded:
+                        best[i] = similarity
+                        break
+            return best
+        except Exception as exc:
+            logger.exception("ChromaDB nearest-neighbour lookup failed")
+            raise DatabaseError("Database search failed") from exc
+
     def get_collection_count(self) -> int:
         """Get the number of documents in the collection."""
         try:
             count = self._collection.count()
-            logger.info("ChromaDB collection has %d documents", count)
+            logger.debug("ChromaDB collection has %d documents", count)
             return count
         except Exception as exc:
             logger.exception("Failed to get collection count")
             raise DatabaseError("Failed to get collection count") from exc
 
     def close(self) -> None:
-        """Close ChromaDB client."""
-        try:
-            self._client.delete_collection(name="semantic_search_temp")  # Just verify connectivity
-        except Exception:
-            pass  # Collection may not exist, that's fine
+        """Close ChromaDB client. The persistent client needs no explicit teardown."""
         logger.info("ChromaDB client closed")
 
 
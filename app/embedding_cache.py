@@ -0,0 +1,106 @@
+"""
+Persistent document embedding cache keyed by the SHA-256 of the text.
+
+Re-ingesting unchanged documents reuses their stored vectors instead of
+running the embedding model again.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import settings
+from .embeddings import get_embedding_backend
+from .utils import get_logger
+
+
+logger = get_logger(__name__)
+
+# Stay below SQLite's default limit on bound parameters per statement
+_MAX_QUERY_PARAMS = 500
+
+
+def text_hash(text: str) -> str:
+    """Return the SHA-256 hex digest identifying a document text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed store of embeddings per (text hash, model).
+    Vectors are stored as float32 or, to halve the cache size, float16;
+    the stored precision is recovered from the blob length on read.
+    """
+
+    def __init__(self, path: str, model: str, dtype: str = "float32") -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._model = model
+        self._dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vec BLOB NOT NULL,
+                PRIMARY KEY (hash, model)
+            )
+            """
+        )
+        self._conn.commit()
+        logger.info("Embedding cache opened at %s", path)
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors found for the given hashes."""
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), _MAX_QUERY_PARAMS):
+                chunk = unique[start:start + _MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, dim, vec FROM embedding_cache "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    [self._model, *chunk],
+                ).fetchall()
+                for hash_value, dim, blob in rows:
+                    dtype = np.float16 if len(blob) == 2 * dim else np.float32
+                    found[hash_value] = np.frombuffer(blob, dtype=dtype).astype(np.float32)
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """Store vectors, replacing any previous entry for the same hash."""
+        rows = [
+            (hash_value, self._model, int(vec.shape[0]), np.asarray(vec, dtype=self._dtype).tobytes())
+            for hash_value, vec in vectors.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (hash, model, dim, vec) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+
+_cache_instance: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Lazily initialize and return a singleton EmbeddingCache instance.
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        # Key on the backend actually loaded so fallback vectors are not
+        # stored under the configured backend's name
+        model = f"{settings.embedding_model_name}:{get_embedding_backend()}"
+        _cache_instance = EmbeddingCache(
+            settings.embedding_cache_db, model, settings.embedding_cache_dtype
+        )
+    return _cache_instance
@@ -1,28 +1,111 @@
 from functools import lru_cache
-from typing import List
+from typing import TYPE_CHECKING, List, Tuple, Union
 
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 
 from .config import settings
 from .utils import get_logger
 
+if TYPE_CHECKING:
+    from .onnx_embeddings import OnnxInt8Encoder
+
 
 logger = get_logger(__name__)
 
+# Backend actually serving encodes; differs from settings on ONNX fallback
+_loaded_backend = settings.embedding_backend
+
+
+def _select_device() -> str:
+    """
+    Pick the fastest available torch device for inference.
+    """
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
 
 @lru_cache(maxsize=1)
-def _get_model() -> SentenceTransformer:
+def _get_model() -> Union[SentenceTransformer, "OnnxInt8Encoder"]:
     """
     Lazily load and cache the embedding model.
+    With EMBEDDING_BACKEND=onnx_int8 an int8 ONNX Runtime encoder is used on
+    CPU, falling back to SentenceTransformer if it cannot be loaded.
     """
-    logger.info("Loading embedding model: %s", settings.embedding_model_name)
-    model = SentenceTransformer(settings.embedding_model_name)
+    global _loaded_backend
+    if settings.embedding_backend == "onnx_int8":
+        try:
+            from .onnx_embeddings import OnnxInt8Encoder
+
+            model = OnnxInt8Encoder(settings.embedding_model_name)
+            _loaded_backend = "onnx_int8"
+            return model
+        except Exception as exc:
+            logger.warning("ONNX int8 backend unavailable (%s); using SentenceTransformer", exc)
+
+    _loaded_backend = "torch"
+
+    device = _select_device()
+    if device == "cpu" and settings.torch_num_threads > 0:
+        torch.set_num_threads(settings.torch_num_threads)
+    logger.info("Loading embedding model: %s on %s", settings.embedding_model_name, device)
+    model = SentenceTransformer(settings.embedding_model_name, device=device)
+    if device == "cuda":
+        # MiniLM is robust to FP16 and it halves memory bandwidth on GPU
+        model.half()
+    if settings.embedding_compile:
+        _compile_model(model)
     return model
 
 
+def _compile_model(model: SentenceTransformer) -> None:
+    """
+    Compile the transformer forward pass with torch.compile to fuse kernels.
+    torch.compile is lazy, so a trial encode forces compilation here; if it
+    fails (older PyTorch, no C++ toolchain for Inductor) the eager model is
+    restored.
+    """
+    transformer = model._first_module()
+    eager_model = transformer.auto_model
+    try:
+        transformer.auto_model = torch.compile(
+            eager_model, mode="reduce-overhead", dynamic=True
+        )
+        model.encode(["warmup"], batch_size=1, convert_to_numpy=True)
+        logger.info("Embedding model compiled with torch.compile")
+    except Exception as exc:
+        transformer.auto_model = eager_model
+        logger.warning("torch.compile unavailable (%s); using eager model", exc)
+
+
+def get_embedding_backend() -> str:
+    """
+    Return the backend of the loaded embedding model ("torch" or "onnx_int8"),
+    loading the model if needed.
+    """
+    _get_model()
+    return _loaded_backend
+
+
+def warmup() -> None:
+    """
+    Load the embedding model and run one forward pass so the first request
+    does not pay the model loading cost.
+    """
+    _get_model().encode(["warmup"], batch_size=1, convert_to_numpy=True)
+    if torch.cuda.is_available():
+        # Make sure kernels are compiled and cuDNN heuristics cached before timing starts
+        torch.cuda.synchronize()
+    logger.info("Embedding model warmed up")
+
+
 def encode_text(text: str) -> List[float]:
     """
-    Generate a 384-dimensional embedding for the given text.
+    Generate a 384-dimensional, L2-normalized embedding for the given text.
     """
     if not text or not text.strip():
         raise ValueError("Text to embed must be a non-empty string.")
@@ -31,6 +114,37 @@ def encode_text(text: str) -> List[float]:
     embedding = model.encode(
         [text],
         convert_to_numpy=True,
+        normalize_embeddings=True,
     )[0]
     return embedding.tolist()
 
+
+@lru_cache(maxsize=settings.embedding_cache_size)
+def cached_encode_text(text: str) -> Tuple[float, ...]:
+    """
+    Cached variant of encode_text for query traffic, where the same
+    questions come back often. Returns an immutable tuple.
+    """
+    return tuple(encode_text(text))
+
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """
+    Generate embeddings for a batch of texts in a single forward pass.
+    Identical texts are encoded once. Returns an array of shape (len(texts), 384).
+    """
+    if any(not text or not text.strip() for text in texts):
+        raise ValueError("Texts to embed must be non-empty strings.")
+
+    positions = {text: i for i, text in enumerate(dict.fromkeys(texts))}
+    model = _get_model()
+    embeddings = model.encode(
+        list(positions),
+        batch_size=settings.embedding_batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    ).astype(np.float32, copy=False)
+    if len(positions) == len(texts):
+        return embeddings
+    return embeddings[[positions[text] for text in texts]]
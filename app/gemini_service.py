@@ -2,139 +2,255 @@
 Gemini LLM service for query enhancement and response reformulation.
 """
 
-from typing import List, Dict, Any
-
-import google.generativeai as genai
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 from .config import settings
-from .utils import get_logger
+from .utils import TTLCache, get_logger
 
 
 logger = get_logger(__name__)
 
 
+# System Message: Optimized for query reformulation with focus on bakery/pastry domain.
+_ENHANCE_SYSTEM_PROMPT = """You are a specialized query optimizer for bakery and pastry ingredient formulation systems.
+
+Your task is to take a user's natural language question and rewrite it to be more suitable for semantic search 
+over technical bakery documentation. The rewritten query should:
+
+1. Include specific technical terminologies used in bakery science (enzymes, improvers, ppm dosages, etc.)
+2. Expand abbreviations and implicit references
+3. Emphasize key technical aspects that would match technical documents
+4. Remove casual language and focus on precise, technical phrasing
+5. Include relevant domain context around enzyme names, compounds, and formulation parameters
+
+Guidelines:
+- If the user asks about "enzyme", specify which enzyme (amylase, xylanase, etc.) if detectable from context
+- Always mention dosage units (ppm, percentage, g/kg) if relevant to the query
+- Expand functions like "improve" to technical outcomes (crumb structure, fermentation, extensibility, etc.)
+- Keep the query concise but technically precise
+- Maintain the user's original intent while enhancing technical clarity
+
+Return ONLY the rewritten query. Do not include explanations or additional text."""
+
+# System Message: Optimized for response formatting with focus on clarity and presentation.
+_REFORMULATE_SYSTEM_PROMPT = """You are a professional technical documentation formatter specializing in bakery science.
+
+Your task is to take raw retrieved technical documents about bakery ingredients and reformulate them into 
+a clear, well-structured response that directly answers the user's question.
+
+Instructions:
+1. Synthesize information from the retrieved fragments to create a cohesive answer
+2. Organize the response with clear sections (Dosage, Functions, Applications, etc.)
+3. Highlight key numerical values (ppm, percentages, temperatures) in bold
+4. Use bullet points for lists of benefits, functions, or applications
+5. Extract and emphasize information most relevant to the user's original question
+6. Maintain technical accuracy while improving readability
+7. Avoid redundant information across fragments
+8. End with a brief practical summary if appropriate
+
+Format the response in clean Markdown with:
+- Clear headers for each section
+- Bold for important values and technical terms
+- Bullet points for lists
+- Proper spacing and structure
+
+Return ONLY the reformatted response in Markdown. Do not include metadata or fragments source information."""
+
+
 class GeminiService:
     """
     Service for LLM-based query enhancement and response reformulation using Google Gemini.
+    Each call has a blocking variant (CLI) and an ``_async`` variant (FastAPI).
     """
 
     def __init__(self) -> None:
+        self._enhance_cache = TTLCache(settings.gemini_cache_size, settings.gemini_cache_ttl)
+        self._reformulate_cache = TTLCache(settings.gemini_cache_size, settings.gemini_cache_ttl)
         if not settings.gemini_api_key:
             logger.warning("Gemini API key not configured; LLM features will be disabled")
-            self._client = None
+            self._enhance_client = None
+            self._reformulate_client = None
         else:
+            # Imported here so code paths that never use Gemini skip the SDK import
+            import google.generativeai as genai
+
             genai.configure(api_key=settings.gemini_api_key)
-            self._client = genai.GenerativeModel(
-                model_name="gemini-1.5-flash",
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.7,
-                    top_p=0.9,
-                    top_k=40,
-                ),
-            )
+            # One model per task with its system prompt attached once, so the
+            # fixed prefix is not re-sent and re-tokenized with every request
+            self._enhance_client = self._create_model(_ENHANCE_SYSTEM_PROMPT)
+            self._reformulate_client = self._create_model(_REFORMULATE_SYSTEM_PROMPT)
             logger.info("Gemini service initialized successfully with model: gemini-1.5-flash")
 
+    @staticmethod
+    def _create_model(system_instruction: str) -> Any:
+        import google.generativeai as genai
+
+        return genai.GenerativeModel(
+            model_name="gemini-1.5-flash",
+            generation_config=genai.types.GenerationConfig(
+                temperature=0.7,
+                top_p=0.9,
+                top_k=40,
+            ),
+            system_instruction=system_instruction,
+        )
+
     def _is_available(self) -> bool:
         """Check if Gemini client is available."""
-        return self._client is not None
+        return self._enhance_client is not None
 
     def enhance_query(self, original_query: str) -> str:
         """
         Rewrite and enhance the user's query to be more suitable for semantic search.
-        
-        System Message: Optimized for query reformulation with focus on bakery/pastry domain.
         """
         if not self._is_available():
             logger.warning("Gemini not available; returning original query")
             return original_query
 
-        system_prompt = """You are a specialized query optimizer for bakery and pastry ingredient formulation systems.
+        cached = self._enhance_cache.get(original_query)
+        if cached is not None:
+            return cached
 
-Your task is to take a user's natural language question and rewrite it to be more suitable for semantic search 
-over technical bakery documentation. The rewritten query should:
-
-1. Include specific technical terminologies used in bakery science (enzymes, improvers, ppm dosages, etc.)
-2. Expand abbreviations and implicit references
-3. Emphasize key technical aspects that would match technical documents
-4. Remove casual language and focus on precise, technical phrasing
-5. Include relevant domain context around enzyme names, compounds, and formulation parameters
+        try:
+            response = self._enhance_client.generate_content(
+                self._enhance_prompt(original_query),
+                stream=False,
+            )
+            return self._store_enhancement(original_query, response.text)
+        except Exception as exc:
+            logger.error("Failed to enhance query with Gemini: %s", exc)
+            return original_query
 
-Guidelines:
-- If the user asks about "enzyme", specify which enzyme (amylase, xylanase, etc.) if detectable from context
-- Always mention dosage units (ppm, percentage, g/kg) if relevant to the query
-- Expand functions like "improve" to technical outcomes (crumb structure, fermentation, extensibility, etc.)
-- Keep the query concise but technically precise
-- Maintain the user's original intent while enhancing technical clarity
+    async def enhance_query_async(self, original_query: str) -> str:
+        """
+        Non-blocking variant of enhance_query for use inside the event loop.
+        """
+        if not self._is_available():
+            logger.warning("Gemini not available; returning original query")
+            return original_query
 
-Return ONLY the rewritten query. Do not include explanations or additional text."""
+        cached = self._enhance_cache.get(original_query)
+        if cached is not None:
+            return cached
 
         try:
-            response = self._client.generate_content(
-                f"{system_prompt}\n\nUser's original query: {original_query}",
-                stream=False,
+            response = await self._enhance_client.generate_content_async(
+                self._enhance_prompt(original_query),
             )
-            
-            enhanced_query = response.text.strip()
-            logger.info("Query enhanced: '%s' -> '%s'", original_query[:50], enhanced_query[:50])
-            return enhanced_query
+            return self._store_enhancement(original_query, response.text)
         except Exception as exc:
             logger.error("Failed to enhance query with Gemini: %s", exc)
             return original_query
 
+    @staticmethod
+    def _enhance_prompt(original_query: str) -> str:
+        return f"User's original query: {original_query}"
+
+    def _store_enhancement(self, original_query: str, text: str) -> str:
+        enhanced_query = text.strip()
+        logger.debug("Query enhanced: '%.50s' -> '%.50s'", original_query, enhanced_query)
+        self._enhance_cache.set(original_query, enhanced_query)
+        return enhanced_query
+
     def reformulate_response(self, retrieved_fragments: List[str], original_query: str) -> str:
         """
         Reformat the retrieved search results into a well-structured, user-friendly response.
-        
-        System Message: Optimized for response formatting with focus on clarity and presentation.
         """
         if not self._is_available():
             logger.warning("Gemini not available; returning raw fragments")
             return self._format_fragments_plain(retrieved_fragments)
 
-        # Prepare the fragments with ranking
-        formatted_fragments = "\n\n---\n\n".join(
-            [f"**Result {idx + 1}:**\n{fragment}" 
-             for idx, fragment in enumerate(retrieved_fragments)]
-        )
-
-        system_prompt = """You are a professional technical documentation formatter specializing in bakery science.
-
-Your task is to take raw retrieved technical documents about bakery ingredients and reformulate them into 
-a clear, well-structured response that directly answers the user's question.
+        cache_key = (original_query, tuple(retrieved_fragments))
+        cached = self._reformulate_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-Instructions:
-1. Synthesize information from the retrieved fragments to create a cohesive answer
-2. Organize the response with clear sections (Dosage, Functions, Applications, etc.)
-3. Highlight key numerical values (ppm, percentages, temperatures) in bold
-4. Use bullet points for lists of benefits, functions, or applications
-5. Extract and emphasize information most relevant to the user's original question
-6. Maintain technical accuracy while improving readability
-7. Avoid redundant information across fragments
-8. End with a brief practical summary if appropriate
+        try:
+            response = self._reformulate_client.generate_content(
+                self._reformulate_prompt(retrieved_fragments, original_query),
+                stream=False,
+            )
+            return self._store_reformulation(cache_key, response.text)
+        except Exception as exc:
+            logger.error("Failed to reformulate response with Gemini: %s", exc)
+            return self._format_fragments_plain(retrieved_fragments)
 
-Format the response in clean Markdown with:
-- Clear headers for each section
-- Bold for important values and technical terms
-- Bullet points for lists
-- Proper spacing and structure
+    async def reformulate_response_async(
+        self, retrieved_fragments: List[str], original_query: str
+    ) -> str:
+        """
+        Non-blocking variant of reformulate_response for use inside the event loop.
+        """
+        if not self._is_available():
+            logger.warning("Gemini not available; returning raw fragments")
+            return self._format_fragments_plain(retrieved_fragments)
 
-Return ONLY the reformatted response in Markdown. Do not include metadata or fragments source information."""
+        cache_key = (original_query, tuple(retrieved_fragments))
+        cached = self._reformulate_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         try:
-            response = self._client.generate_content(
-                f"{system_prompt}\n\n"
-                f"User's question: {original_query}\n\n"
-                f"Retrieved technical documents:\n\n{formatted_fragments}",
-                stream=False,
+            response = await self._reformulate_client.generate_content_async(
+                self._reformulate_prompt(retrieved_fragments, original_query),
             )
-            
-            reformulated = response.text.strip()
-            logger.info("Response reformulated successfully (%d chars)", len(reformulated))
-            return reformulated
+            return self._store_reformulation(cache_key, response.text)
         except Exception as exc:
             logger.error("Failed to reformulate response with Gemini: %s", exc)
             return self._format_fragments_plain(retrieved_fragments)
 
+    def reformulate_response_stream(
+        self, retrieved_fragments: List[str], original_query: str
+    ) -> Iterator[str]:
+        """
+        Stream the reformulated response as Markdown chunks as Gemini generates them.
+        """
+        if not self._is_available():
+            logger.warning("Gemini not available; returning raw fragments")
+            yield self._format_fragments_plain(retrieved_fragments)
+            return
+
+        cache_key = (original_query, tuple(retrieved_fragments))
+        cached = self._reformulate_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks: List[str] = []
+        try:
+            response = self._reformulate_client.generate_content(
+                self._reformulate_prompt(retrieved_fragments, original_query),
+                stream=True,
+            )
+            for chunk in response:
+                chunks.append(chunk.text)
+                yield chunk.text
+        except Exception as exc:
+            logger.error("Failed to stream reformulated response from Gemini: %s", exc)
+            if not chunks:
+                yield self._format_fragments_plain(retrieved_fragments)
+            return
+
+        self._store_reformulation(cache_key, "".join(chunks))
+
+    @staticmethod
+    def _reformulate_prompt(retrieved_fragments: List[str], original_query: str) -> str:
+        # Prepare the fragments with ranking
+        formatted_fragments = "\n\n---\n\n".join(
+            [f"**Result {idx + 1}:**\n{fragment}" 
+             for idx, fragment in enumerate(retrieved_fragments)]
+        )
+        return (
+            f"User's question: {original_query}\n\n"
+            f"Retrieved technical documents:\n\n{formatted_fragments}"
+        )
+
+    def _store_reformulation(self, cache_key: Tuple[str, Tuple[str, ...]], text: str) -> str:
+        reformulated = text.strip()
+        logger.debug("Response reformulated successfully (%d chars)", len(reformulated))
+        self._reformulate_cache.set(cache_key, reformulated)
+        return reformulated
+
     @staticmethod
     def _format_fragments_plain(fragments: List[str]) -> str:
         """Fallback plain text formatting if Gemini is unavailable."""
@@ -146,5 +262,14 @@ Return ONLY the reformatted response in Markdown. Do not include metadata or fra
         return "\n".join(lines)
 
 
-# Global instance
-gemini_service = GeminiService()
+_gemini_instance: Optional[GeminiService] = None
+
+
+def get_gemini_service() -> GeminiService:
+    """
+    Lazily initialize and return a singleton GeminiService instance.
+    """
+    global _gemini_instance
+    if _gemini_instance is None:
+        _gemini_instance = GeminiService()
+    return _gemini_instance
@@ -0,0 +1,159 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .config import settings
+from .search_service import search_service
+from .utils import get_logger, read_text_file
+
+
+logger = get_logger(__name__)
+
+# (id_document, doc_id, text)
+Document = Tuple[int, str, str]
+
+_READ_WORKERS = 16
+
+
+@dataclass
+class IngestionReport:
+    ingested: int = 0
+    skipped: int = 0
+    unreadable: int = 0
+    failed: int = 0
+
+    @property
+    def ok(self) -> bool:
+        """True when every file was either ingested or skipped as a near-duplicate."""
+        return self.unreadable == 0 and self.failed == 0
+
+
+def read_documents(
+    file_paths: List[Path], report: IngestionReport, start: int = 1
+) -> Iterator[Document]:
+    """
+    Read files concurrently on a thread pool, yielding (id_document, doc_id, text)
+    in input order. Files that cannot be read or decoded are logged and counted
+    as unreadable instead of aborting the run.
+
+    Reads are submitted in a sliding window of twice the embedding batch size,
+    so a slow consumer holds back the readers instead of the whole folder
+    being loaded into memory.
+    """
+
+    def read(item: Tuple[int, Path]) -> Optional[Document]:
+        idx, file_path = item
+        try:
+            return idx, file_path.stem, read_text_file(file_path)
+        except (OSError, UnicodeDecodeError) as exc:
+            logger.error("Failed to read %s: %s", file_path, exc)
+            return None
+
+    window = 2 * settings.embedding_batch_size
+    items = enumerate(file_paths, start=start)
+    with ThreadPoolExecutor(max_workers=_READ_WORKERS) as executor:
+        pending: Deque[Future] = deque(
+            executor.submit(read, item) for item in islice(items, window)
+        )
+        while pending:
+            document = pending.popleft().result()
+            for item in islice(items, 1):
+                pending.append(executor.submit(read, item))
+            if document is None:
+                report.unreadable += 1
+            else:
+                yield document
+
+
+def ingest_batch(batch: List[Document], report: IngestionReport) -> None:
+    """
+    Ingest a batch of documents with one embedding pass.
+    If the batch fails, fall back to one document at a time so a single bad
+    document does not drop the whole batch.
+    """
+    try:
+        ingested_ids = set(search_service.add_documents(
+            [doc_id for _, doc_id, _ in batch],
+            [text for _, _, text in batch],
+            [idx for idx, _, _ in batch],
+        ))
+        _log_ingested(batch, ingested_ids)
+        report.ingested += len(ingested_ids)
+        report.skipped += len(batch) - len(ingested_ids)
+        return
+    except Exception as exc:
+        logger.warning("Batch ingestion failed (%s); retrying documents one by one", exc)
+
+    for idx, doc_id, text in batch:
+        try:
+            # Single-document batches keep the embedding cache and near-duplicate check
+            ingested_ids = set(search_service.add_documents([doc_id], [text], [idx]))
+        except Exception as exc:
+            logger.error("[%d] Failed to ingest %s: %s", idx, doc_id, exc)
+            report.failed += 1
+            continue
+        _log_ingested([(idx, doc_id, text)], ingested_ids)
+        report.ingested += len(ingested_ids)
+        report.skipped += 1 - len(ingested_ids)
+
+
+def _log_ingested(batch: List[Document], ingested_ids: Set[str]) -> None:
+    for idx, doc_id, text in batch:
+        if doc_id in ingested_ids:
+            logger.info("[%d] Ingested: %s (%d chars)", idx, doc_id, len(text))
+
+
+def ingest_documents(documents: Iterable[Document], report: IngestionReport) -> None:
+    """
+    Ingest documents in batches of EMBEDDING_BATCH_SIZE.
+
+    Reading and ingestion are pipelined: while a background worker embeds and
+    writes one batch, the next batch is collected from the readers. The next
+    batch is only handed over once the previous one is written, so at most one
+    batch is being ingested, one is being collected and one read window is
+    in flight.
+    """
+    batch_size = settings.embedding_batch_size
+    pending: Optional[Future] = None
+    batch: List[Document] = []
+
+    with ThreadPoolExecutor(max_workers=1) as ingester:
+        for document in documents:
+            batch.append(document)
+            if len(batch) < batch_size:
+                continue
+            if pending is not None:
+                pending.result()
+            pending = ingester.submit(ingest_batch, batch, report)
+            batch = []
+
+        if pending is not None:
+            pending.result()
+        if batch:
+            ingest_batch(batch, report)
+
+
+def ingest_files(file_paths: List[Path], start: int = 1) -> IngestionReport:
+    """
+    Read and ingest text files, numbering them from start.
+    Returns counts of ingested, skipped (near-duplicate), unreadable and failed files.
+    """
+    report = IngestionReport()
+    if not file_paths:
+        return report
+
+    # Load the model up front so the first batch does not pay the load cost
+    search_service.warmup()
+    ingest_documents(read_documents(file_paths, report, start), report)
+    logger.info(
+        "Ingested %d/%d documents (%d near-duplicates skipped, %d unreadable, %d failed)",
+        report.ingested,
+        len(file_paths),
+        report.skipped,
+        report.unreadable,
+        report.failed,
+    )
+    return report
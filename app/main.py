@@ -1,18 +1,20 @@
 import argparse
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 import os
 
+from .config import settings
 from .database import DatabaseError, get_db
 from .search_service import SearchResult, search_service
-from .utils import get_logger
+from .ingestion import ingest_files
+from .utils import get_logger, list_text_files
 
 
 logger = get_logger(__name__)
@@ -35,6 +37,10 @@ class SearchRequest(BaseModel):
     use_gemini: bool = Field(True, description="Use Gemini for query enhancement and response reformulation")
 
 
+class SearchBatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, description="Natural language questions")
+
+
 class IngestRequest(BaseModel):
     documents: List[Dict[str, str]] = Field(
         ..., description="List of documents with 'id' and 'text' keys"
@@ -42,6 +48,8 @@ class IngestRequest(BaseModel):
 
 
 class SearchResponseItem(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int
     id_document: int
     texte_fragment: str
@@ -53,6 +61,10 @@ class SearchResponse(BaseModel):
     reformulated_response: Optional[str] = None
 
 
+class SearchBatchResponse(BaseModel):
+    results: List[List[SearchResponseItem]]
+
+
 class StatusResponse(BaseModel):
     status: str
     total_documents: int
@@ -64,6 +76,38 @@ class IngestResponse(BaseModel):
     documents_ingested: int
 
 
+@app.on_event("startup")
+def _warmup() -> None:
+    """
+    Load the embedding model and open the vector store at boot so the
+    first request does not pay for them.
+    """
+    search_service.warmup()
+    get_db()
+
+
+def _to_response_items(results: List[SearchResult]) -> List[SearchResponseItem]:
+    """
+    Build response items without validation; SearchResult fields are already typed.
+    """
+    return [
+        SearchResponseItem.model_construct(
+            id=r.id,
+            id_document=r.id_document,
+            texte_fragment=r.text,
+            score=r.score,
+        )
+        for r in results
+    ]
+
+
+def _json_response(model: BaseModel) -> Response:
+    """
+    Serialize a trusted model directly, skipping FastAPI's response_model re-validation.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
 def _format_cli_results(results: List[SearchResult]) -> str:
     if not results:
         return "No results found.\n"
@@ -86,7 +130,7 @@ def index(request: Request) -> HTMLResponse:
 
 
 @app.post("/search", response_model=SearchResponse)
-def search_endpoint(payload: SearchRequest) -> SearchResponse:
+async def search_endpoint(payload: SearchRequest) -> Response:
     """
     Search for semantically similar documents with optional Gemini enhancement.
     
@@ -98,28 +142,77 @@ def search_endpoint(payload: SearchRequest) -> SearchResponse:
     try:
         if payload.use_gemini:
             # Get results and reformulated response
-            results, reformulated = search_service.search_with_reformulation(
+            results, reformulated = await search_service.search_with_reformulation_async(
                 payload.question, use_gemini=True
             )
         else:
             # Get only results without Gemini
-            results = search_service.search(payload.question, use_gemini=False)
+            results = await search_service.search_async(payload.question, use_gemini=False)
             reformulated = None
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except DatabaseError:
         raise HTTPException(status_code=503, detail="Vector store unavailable")
 
-    items = [
-        SearchResponseItem(
-            id=r.id,
-            id_document=r.id_document,
-            texte_fragment=r.text,
-            score=r.score,
+    return _json_response(
+        SearchResponse.model_construct(
+            results=_to_response_items(results),
+            reformulated_response=reformulated,
         )
-        for r in results
-    ]
-    return SearchResponse(results=items, reformulated_response=reformulated)
+    )
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/search_stream")
+async def search_stream_endpoint(payload: SearchRequest) -> StreamingResponse:
+    """
+    Search and stream the response as server-sent events.
+    
+    A "results" event carries the search results as soon as they are known,
+    followed by "reformulation" events with Markdown chunks from Gemini
+    (when use_gemini=true) and a final "done" event.
+    """
+    try:
+        results = await search_service.search_async(
+            payload.question, use_gemini=payload.use_gemini
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except DatabaseError:
+        raise HTTPException(status_code=503, detail="Vector store unavailable")
+
+    def events() -> Iterator[str]:
+        items = [item.model_dump() for item in _to_response_items(results)]
+        yield _sse_event("results", items)
+        if payload.use_gemini:
+            for chunk in search_service.stream_reformulation(payload.question, results):
+                yield _sse_event("reformulation", chunk)
+        yield _sse_event("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/search_batch", response_model=SearchBatchResponse)
+def search_batch_endpoint(payload: SearchBatchRequest) -> Response:
+    """
+    Search for several questions in one call, without Gemini enhancement.
+    Results are returned in the same order as the questions.
+    """
+    try:
+        batch_results = search_service.search_batch(payload.questions)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except DatabaseError:
+        raise HTTPException(status_code=503, detail="Vector store unavailable")
+
+    return _json_response(
+        SearchBatchResponse.model_construct(
+            results=[_to_response_items(results) for results in batch_results]
+        )
+    )
 
 
 @app.post("/ingest", response_model=IngestResponse)
@@ -132,21 +225,21 @@ def ingest_endpoint(payload: IngestRequest) -> IngestResponse:
         raise HTTPException(status_code=400, detail="No documents provided")
 
     try:
-        count = 0
+        doc_ids: List[str] = []
+        texts: List[str] = []
+        id_documents: List[int] = []
         for doc in payload.documents:
             if "id" not in doc or "text" not in doc:
                 raise ValueError("Each document must have 'id' and 'text' keys")
-            
-            search_service.add_document(
-                doc_id=doc["id"],
-                text=doc["text"],
-                id_document=int(doc.get("id_document", 0)),
-            )
-            count += 1
-        
+            doc_ids.append(doc["id"])
+            texts.append(doc["text"])
+            id_documents.append(int(doc.get("id_document", 0)))
+
+        ingested_ids = search_service.add_documents(doc_ids, texts, id_documents)
+
         return IngestResponse(
             status="success",
-            documents_ingested=count,
+            documents_ingested=len(ingested_ids),
         )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -160,7 +253,6 @@ def status_endpoint() -> StatusResponse:
     Get the status of the semantic search service.
     """
     try:
-        from .config import settings
         count = search_service.get_collection_count()
         return StatusResponse(
             status="healthy",
@@ -276,23 +368,18 @@ def main(argv: Optional[List[str]] = None) -> int:
             if not folder_path.exists():
                 logger.error("Folder %s does not exist", args.folder)
                 return 1
+            if not folder_path.is_dir():
+                logger.error("%s is not a directory", args.folder)
+                return 1
             
-            doc_count = 0
-            for file_path in folder_path.glob("*.txt"):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    text = f.read()
-                
-                doc_id = file_path.stem
-                search_service.add_document(
-                    doc_id=doc_id,
-                    text=text,
-                    id_document=doc_count + 1,
-                )
-                doc_count += 1
-                logger.info("Ingested document: %s", doc_id)
-            
-            logger.info("Successfully ingested %d documents", doc_count)
-            return 0
+            # Files are read on a thread pool while earlier batches are embedded;
+            # unreadable files are reported without aborting the other files
+            report = ingest_files(list_text_files(folder_path))
+            logger.info("Successfully ingested %d documents", report.ingested)
+            return 0 if report.ok else 1
+        except ValueError as exc:
+            logger.error("%s", exc)
+            return 2
         except DatabaseError as exc:
             logger.error("%s", exc)
             return 3
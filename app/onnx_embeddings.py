@@ -0,0 +1,131 @@
+"""
+INT8-quantized ONNX Runtime encoder for CPU inference.
+
+Requires the optional ``optimum[onnxruntime]`` dependency. The model is
+exported and quantized once, then reused from ``settings.onnx_model_dir``.
+"""
+
+import json
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import onnxruntime as ort
+from huggingface_hub import hf_hub_download
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from optimum.onnxruntime import ORTModelForFeatureExtraction
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
+
+from .config import settings
+from .utils import get_logger
+
+
+logger = get_logger(__name__)
+
+_QUANTIZED_FILE = "model_int8.onnx"
+_SBERT_CONFIG_FILE = "sentence_bert_config.json"
+# Upper bound for tokenizers that report a sentinel model_max_length
+_MAX_POSITIONS = 512
+
+
+def _hub_model_id(model_name: str) -> str:
+    """Resolve short sentence-transformers names to their Hugging Face id."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def _export_quantized(model_name: str, target_dir: Path) -> None:
+    """Export the model to ONNX and dynamically quantize its weights to int8."""
+    model_id = _hub_model_id(model_name)
+    logger.info("Exporting %s to ONNX in %s", model_id, target_dir)
+    ORTModelForFeatureExtraction.from_pretrained(model_id, export=True).save_pretrained(target_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(target_dir)
+    quantize_dynamic(
+        str(target_dir / "model.onnx"),
+        str(target_dir / _QUANTIZED_FILE),
+        weight_type=QuantType.QInt8,
+    )
+
+
+def _max_seq_length(model_name: str, target_dir: Path, tokenizer: PreTrainedTokenizerBase) -> int:
+    """
+    Read the truncation length sentence-transformers uses for this model from
+    its sentence_bert_config.json, so both backends embed the same tokens.
+    Falls back to the tokenizer's own limit when the model has no such file.
+    """
+    config_path = target_dir / _SBERT_CONFIG_FILE
+    if not config_path.exists():
+        try:
+            hf_hub_download(_hub_model_id(model_name), _SBERT_CONFIG_FILE, local_dir=target_dir)
+        except Exception as exc:
+            logger.warning("No %s for %s (%s)", _SBERT_CONFIG_FILE, model_name, exc)
+
+    if config_path.exists():
+        with open(config_path, "r", encoding="utf-8") as f:
+            max_seq_length = json.load(f).get("max_seq_length")
+        if max_seq_length:
+            return int(max_seq_length)
+    return min(tokenizer.model_max_length, _MAX_POSITIONS)
+
+
+class OnnxInt8Encoder:
+    """
+    Drop-in replacement for the parts of SentenceTransformer.encode used by
+    this application: tokenization, int8 forward pass and mean pooling.
+    """
+
+    def __init__(self, model_name: str) -> None:
+        target_dir = Path(settings.onnx_model_dir) / model_name.replace("/", "__")
+        if not (target_dir / _QUANTIZED_FILE).exists():
+            _export_quantized(model_name, target_dir)
+
+        self._tokenizer = AutoTokenizer.from_pretrained(target_dir)
+        self._max_seq_length = _max_seq_length(model_name, target_dir, self._tokenizer)
+        self._session = ort.InferenceSession(
+            str(target_dir / _QUANTIZED_FILE),
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {inp.name for inp in self._session.get_inputs()}
+        logger.info(
+            "Loaded int8 ONNX embedding model from %s (max_seq_length=%d)",
+            target_dir,
+            self._max_seq_length,
+        )
+
+    def encode(
+        self,
+        sentences: List[str],
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        """Encode sentences into an array of shape (len(sentences), dim)."""
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batches.append(self._encode_batch(sentences[start:start + batch_size]))
+        embeddings = np.concatenate(batches, axis=0)
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+        return embeddings
+
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        tokens = self._tokenizer(
+            sentences,
+            padding=True,
+            truncation=True,
+            max_length=self._max_seq_length,
+            return_tensors="np",
+        )
+        feeds = {
+            name: tokens[name].astype(np.int64)
+            for name in ("input_ids", "attention_mask", "token_type_ids")
+            if name in self._input_names and name in tokens
+        }
+        token_embeddings = self._session.run(None, feeds)[0]
+
+        # Mean pooling over non-padding tokens, as in sentence-transformers
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return (summed / np.clip(mask.sum(axis=1), 1e-9, None)).astype(np.float32)
@@ -1,11 +1,16 @@
+import asyncio
+import sqlite3
 from dataclasses import dataclass
-from typing import List
+from typing import Iterator, List
+
+import numpy as np
 
 from .config import settings
-from .database import DatabaseError, get_db
-from .embeddings import encode_text
-from .gemini_service import gemini_service
-from .utils import get_logger
+from .database import BaseDatabase, DatabaseError, get_db
+from .embedding_cache import get_embedding_cache, text_hash
+from .embeddings import cached_encode_text, encode_text, encode_texts, warmup
+from .gemini_service import get_gemini_service
+from .utils import cosine_similarity_batch, get_logger
 
 
 logger = get_logger(__name__)
@@ -28,6 +33,12 @@ class SemanticSearchService:
     def __init__(self) -> None:
         self._top_k = settings.top_k
 
+    def warmup(self) -> None:
+        """
+        Load the embedding model ahead of the first search or ingestion.
+        """
+        warmup()
+
     def search(self, question: str, use_gemini: bool = True) -> List[SearchResult]:
         """
         Perform semantic search for the given natural-language question.
@@ -38,52 +49,104 @@ class SemanticSearchService:
         3. Search in ChromaDB
         4. Return top-K results
         """
-        question = (question or "").strip()
-        if not question:
-            raise ValueError("Question must be a non-empty string.")
+        question = self._validate_question(question)
 
         # Step 1: Enhance query using Gemini if enabled
         search_query = question
         if use_gemini:
-            logger.info("Enhancing query with Gemini for better semantic matching")
-            search_query = gemini_service.enhance_query(question)
-            if search_query != question:
-                logger.info("Original query: %s", question)
-                logger.info("Enhanced query: %s", search_query)
+            logger.debug("Enhancing query with Gemini for better semantic matching")
+            search_query = get_gemini_service().enhance_query(question)
+            self._log_enhancement(question, search_query)
+
+        return self._retrieve(search_query)
+
+    async def search_async(self, question: str, use_gemini: bool = True) -> List[SearchResult]:
+        """
+        Non-blocking variant of search for the FastAPI event loop.
+        The Gemini call is awaited and the CPU-bound embedding and vector
+        store lookup run in a worker thread.
+        """
+        question = self._validate_question(question)
+
+        search_query = question
+        if use_gemini:
+            logger.debug("Enhancing query with Gemini for better semantic matching")
+            search_query = await get_gemini_service().enhance_query_async(question)
+            self._log_enhancement(question, search_query)
 
-        logger.info("Starting semantic search with top_k=%d", self._top_k)
+        return await asyncio.to_thread(self._retrieve, search_query)
+
+    @staticmethod
+    def _validate_question(question: str) -> str:
+        question = (question or "").strip()
+        if not question:
+            raise ValueError("Question must be a non-empty string.")
+        return question
+
+    @staticmethod
+    def _log_enhancement(question: str, search_query: str) -> None:
+        if search_query != question:
+            logger.debug("Original query: %s", question)
+            logger.debug("Enhanced query: %s", search_query)
+
+    def _retrieve(self, search_query: str) -> List[SearchResult]:
+        """Embed the (possibly enhanced) query and search the vector store."""
+        logger.debug("Starting semantic search with top_k=%d", self._top_k)
         
         try:
             # Step 2: Generate embedding for the (enhanced) query
-            embedding = encode_text(search_query)
-            logger.info("Generated embedding for question")
+            embedding = list(cached_encode_text(search_query))
+            logger.debug("Generated embedding for question")
             
             # Step 3: Search in ChromaDB
             db = get_db()
             results_data = db.search(embedding, top_k=self._top_k)
             
             # Convert to SearchResult objects
-            results: List[SearchResult] = []
-            for r in results_data:
-                results.append(
-                    SearchResult(
-                        id=r["id"],
-                        id_document=int(r.get("metadata", {}).get("id_document", 0)),
-                        text=r["text"],
-                        score=float(r["score"]),
-                    )
-                )
+            results = self._to_search_results(results_data)
             
             if not results:
-                logger.info("Search returned no results")
+                logger.debug("Search returned no results")
             else:
-                logger.info("Search returned %d results", len(results))
+                logger.debug("Search returned %d results", len(results))
 
             return results
         except DatabaseError:
             logger.exception("Semantic search failed due to database error")
             raise
 
+    def search_batch(self, questions: List[str]) -> List[List[SearchResult]]:
+        """
+        Perform semantic search for several questions at once, without Gemini.
+        All questions are embedded in one batch and sent in a single vector store query.
+        """
+        questions = [(question or "").strip() for question in questions]
+        if not questions or not all(questions):
+            raise ValueError("Questions must be non-empty strings.")
+
+        logger.debug("Starting batch semantic search for %d questions", len(questions))
+        try:
+            embeddings = encode_texts(questions)
+            db = get_db()
+            batch_data = db.search_batch(embeddings.tolist(), top_k=self._top_k)
+            return [self._to_search_results(results_data) for results_data in batch_data]
+        except DatabaseError:
+            logger.exception("Batch semantic search failed due to database error")
+            raise
+
+    @staticmethod
+    def _to_search_results(results_data: List[dict]) -> List[SearchResult]:
+        """Convert raw vector store results to SearchResult objects."""
+        return [
+            SearchResult(
+                id=r["id"],
+                id_document=int((r.get("metadata") or {}).get("id_document", 0)),
+                text=r["text"],
+                score=float(r["score"]),
+            )
+            for r in results_data
+        ]
+
     def search_with_reformulation(self, question: str, use_gemini: bool = True) -> tuple:
         """
         Perform semantic search and reformulate the response using Gemini.
@@ -97,24 +160,60 @@ class SemanticSearchService:
         # Step 4: Reformulate response using Gemini if available and we have results
         reformulated_response = None
         if use_gemini and results:
-            logger.info("Reformulating response with Gemini")
+            logger.debug("Reformulating response with Gemini")
             fragment_texts = [r.text for r in results]
-            reformulated_response = gemini_service.reformulate_response(
+            reformulated_response = get_gemini_service().reformulate_response(
                 fragment_texts, question
             )
         
         return results, reformulated_response
 
+    async def search_with_reformulation_async(
+        self, question: str, use_gemini: bool = True
+    ) -> tuple:
+        """
+        Non-blocking variant of search_with_reformulation for the FastAPI event loop.
+        
+        Returns:
+            Tuple of (results, reformulated_response)
+        """
+        results = await self.search_async(question, use_gemini=use_gemini)
+
+        reformulated_response = None
+        if use_gemini and results:
+            logger.debug("Reformulating response with Gemini")
+            fragment_texts = [r.text for r in results]
+            reformulated_response = await get_gemini_service().reformulate_response_async(
+                fragment_texts, question
+            )
+
+        return results, reformulated_response
+
+    def stream_reformulation(
+        self, question: str, results: List[SearchResult]
+    ) -> Iterator[str]:
+        """
+        Stream the Gemini reformulation of search results chunk by chunk.
+        """
+        if not results:
+            return iter(())
+        logger.debug("Streaming reformulated response with Gemini")
+        return get_gemini_service().reformulate_response_stream(
+            [r.text for r in results], question
+        )
+
     def add_document(self, doc_id: str, text: str, id_document: int = 0) -> None:
         """
         Add a document to the vector store.
-        The embedding will be generated automatically by ChromaDB.
+        The embedding is generated with the application's embedding model.
         """
+        embedding = encode_text(text)
         try:
             db = get_db()
             db.add_document(
                 doc_id=doc_id,
                 text=text,
+                embedding=embedding,
                 metadata={"id_document": id_document},
             )
             logger.info("Document %s added to vector store", doc_id)
@@ -122,6 +221,113 @@ class SemanticSearchService:
             logger.exception("Failed to add document")
             raise
 
+    def add_documents(
+        self, doc_ids: List[str], texts: List[str], id_documents: List[int]
+    ) -> List[str]:
+        """
+        Add a batch of documents to the vector store.
+        Documents are processed in chunks of EMBEDDING_BATCH_SIZE: one batched
+        encode, near-duplicate check and upsert per chunk, which bounds memory
+        for large payloads. Returns the ids of the documents written, which
+        exclude skipped near-duplicates.
+        """
+        if not doc_ids:
+            return []
+
+        if len(set(doc_ids)) != len(doc_ids):
+            # A single upsert rejects repeated ids; keep the last occurrence,
+            # as consecutive single-document upserts would
+            last = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+            keep = sorted(last.values())
+            doc_ids = [doc_ids[i] for i in keep]
+            texts = [texts[i] for i in keep]
+            id_documents = [id_documents[i] for i in keep]
+
+        batch_size = settings.embedding_batch_size
+        ingested_ids: List[str] = []
+        for start in range(0, len(doc_ids), batch_size):
+            end = start + batch_size
+            ingested_ids.extend(
+                self._add_chunk(doc_ids[start:end], texts[start:end], id_documents[start:end])
+            )
+        return ingested_ids
+
+    def _add_chunk(
+        self, doc_ids: List[str], texts: List[str], id_documents: List[int]
+    ) -> List[str]:
+        """Embed, deduplicate and upsert one chunk of documents with unique ids."""
+        embeddings = self._embed_documents(texts)
+        try:
+            db = get_db()
+            if settings.dedup_threshold > 0:
+                keep = self._find_unique(db, doc_ids, embeddings)
+                doc_ids = [doc_ids[i] for i in keep]
+                texts = [texts[i] for i in keep]
+                id_documents = [id_documents[i] for i in keep]
+                embeddings = embeddings[keep]
+                if not doc_ids:
+                    return []
+            db.add_documents(
+                doc_ids=doc_ids,
+                texts=texts,
+                embeddings=np.ascontiguousarray(embeddings, dtype=np.float32),
+                metadatas=[{"id_document": id_document} for id_document in id_documents],
+            )
+            logger.info("%d documents added to vector store", len(doc_ids))
+            return doc_ids
+        except DatabaseError:
+            logger.exception("Failed to add documents")
+            raise
+
+    @staticmethod
+    def _find_unique(db: BaseDatabase, doc_ids: List[str], embeddings: np.ndarray) -> List[int]:
+        """
+        Return the indices of documents that are not near-duplicates of a stored
+        document or of an earlier document in the same batch. Stored entries
+        with the same id are ignored since the upsert replaces them.
+        """
+        threshold = settings.dedup_threshold
+        best = db.max_similarity(embeddings, doc_ids)
+        within_batch = cosine_similarity_batch(embeddings, embeddings)
+        keep: List[int] = []
+        for i, doc_id in enumerate(doc_ids):
+            similarity = within_batch[i, keep].max(initial=best[i])
+            if similarity > threshold:
+                logger.info("Skipping near-duplicate document %s (similarity %.3f)", doc_id, similarity)
+            else:
+                keep.append(i)
+        return keep
+
+    @staticmethod
+    def _embed_documents(texts: List[str]) -> np.ndarray:
+        """
+        Embed document texts, reusing vectors from the persistent embedding
+        cache for texts that were already embedded by the same model.
+        """
+        if not settings.embedding_cache_db:
+            return encode_texts(texts)
+
+        try:
+            cache = get_embedding_cache()
+            hashes = [text_hash(text) for text in texts]
+            vectors = cache.get_many(hashes)
+        except sqlite3.Error as exc:
+            logger.warning("Embedding cache unavailable (%s); embedding all documents", exc)
+            return encode_texts(texts)
+
+        missing = [i for i, hash_value in enumerate(hashes) if hash_value not in vectors]
+        logger.debug("Embedding cache hits: %d/%d", len(texts) - len(missing), len(texts))
+        if missing:
+            fresh = encode_texts([texts[i] for i in missing])
+            fresh_vectors = {hashes[i]: fresh[row] for row, i in enumerate(missing)}
+            vectors.update(fresh_vectors)
+            try:
+                cache.put_many(fresh_vectors)
+            except sqlite3.Error as exc:
+                logger.warning("Failed to update embedding cache: %s", exc)
+
+        return np.stack([vectors[hash_value] for hash_value in hashes])
+
     def get_collection_count(self) -> int:
         """Get the number of documents in the vector store."""
         try:
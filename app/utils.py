@@ -1,49 +1,146 @@
 import logging
-import math
-from typing import Iterable, Sequence
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Iterable, List, Optional, Sequence
+
+import numpy as np
 
 
 def get_logger(name: str) -> logging.Logger:
     """
     Return a logger with a consistent configuration.
     """
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
     logger = logging.getLogger(name)
     if not logging.getLogger().handlers:
         logging.basicConfig(
-            level=logging.INFO,
+            level=level,
             format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
         )
+    logger.setLevel(level)
     return logger
 
 
+_MMAP_THRESHOLD = 64 * 1024
+
+
+def list_text_files(folder: Path) -> List[Path]:
+    """
+    List the .txt files of a folder with os.scandir, sorted by name so that
+    document numbering is stable across runs.
+    """
+    with os.scandir(folder) as entries:
+        names = [
+            entry.name
+            for entry in entries
+            if entry.name.endswith(".txt") and entry.is_file()
+        ]
+    return [Path(folder) / name for name in sorted(names)]
+
+
+def read_text_file(path: Path) -> str:
+    """
+    Read a UTF-8 text file. Files larger than 64 KB are memory-mapped so the
+    kernel pages them in directly instead of copying through a read buffer.
+    """
+    if os.path.getsize(path) <= _MMAP_THRESHOLD:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = str(mm, "utf-8")
+    # Match the universal-newline translation of text-mode reads
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
 def to_pgvector(embedding: Sequence[float]) -> str:
     """
     Convert a sequence of floats to a PostgreSQL pgvector literal.
     """
-    return "[" + ",".join(f"{value:.8f}" for value in embedding) + "]"
+    if isinstance(embedding, np.ndarray):
+        embedding = embedding.tolist()
+    # One %-format over a prebuilt template is faster than a per-value f-string
+    return ("[" + ",".join(["%.8f"] * len(embedding)) + "]") % tuple(embedding)
 
 
-def parse_embedding(text: str) -> Sequence[float]:
+def parse_embedding(text: str) -> np.ndarray:
     """
     Parse a comma-separated embedding representation from SQLite.
     """
-    return [float(x) for x in text.split(",") if x]
+    if ",," in text or text.startswith(",") or text.endswith(","):
+        # np.fromstring stops silently at an empty field, so skip them here
+        return np.array([float(x) for x in text.split(",") if x], dtype=np.float32)
+    return np.fromstring(text, sep=",", dtype=np.float32)
 
 
 def cosine_similarity(a: Iterable[float], b: Iterable[float]) -> float:
     """
     Compute cosine similarity between two vectors.
     """
-    a_list = list(a)
-    b_list = list(b)
-    if len(a_list) != len(b_list):
+    a_arr = np.asarray(a if isinstance(a, (Sequence, np.ndarray)) else list(a), dtype=np.float32)
+    b_arr = np.asarray(b if isinstance(b, (Sequence, np.ndarray)) else list(b), dtype=np.float32)
+    if a_arr.shape != b_arr.shape:
         raise ValueError("Vectors must have the same dimension for cosine similarity.")
 
-    dot = sum(x * y for x, y in zip(a_list, b_list))
-    norm_a = math.sqrt(sum(x * x for x in a_list))
-    norm_b = math.sqrt(sum(y * y for y in b_list))
+    norm_a = np.linalg.norm(a_arr)
+    norm_b = np.linalg.norm(b_arr)
     if norm_a == 0.0 or norm_b == 0.0:
         return 0.0
-    return dot / (norm_a * norm_b)
+    return float(a_arr @ b_arr / (norm_a * norm_b))
+
+
+def cosine_similarity_batch(queries: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Compute pairwise cosine similarities between the rows of two 2-D arrays.
+    Returns an array of shape (len(queries), len(matrix)); zero vectors score 0.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if queries.shape[1] != matrix.shape[1]:
+        raise ValueError("Vectors must have the same dimension for cosine similarity.")
+
+    norms_q = np.linalg.norm(queries, axis=1)
+    norms_m = np.linalg.norm(matrix, axis=1)
+    norms_q[norms_q == 0.0] = np.inf
+    norms_m[norms_m == 0.0] = np.inf
+    return queries @ matrix.T / (norms_q[:, None] * norms_m[None, :])
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
 
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            timestamp, value = entry
+            if time.monotonic() - timestamp > self._ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
 
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        if self._maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
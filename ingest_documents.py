@@ -1,58 +1,75 @@
 #!/usr/bin/env python3
 """
 Ingestion script to load documents from data/enzymes/ into the vector store.
+
+Usage: python3 ingest_documents.py [FOLDER ...]   (defaults to data/enzymes)
 """
 
 import sys
+from collections import defaultdict
 from pathlib import Path
+from typing import Dict, List, Optional
 
 # Add app directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
+from app.ingestion import ingest_files
 from app.search_service import search_service
-from app.utils import get_logger
+from app.utils import get_logger, list_text_files
 
 logger = get_logger(__name__)
 
-def ingest_documents_from_folder(folder_path: str) -> int:
+
+def _list_folder(folder_path: str) -> Optional[List[Path]]:
     """
-    Load all .txt files from a folder and ingest them into the vector store.
+    Return the .txt files of a folder, sorted by name so id_document is stable
+    across runs, or None if the folder cannot be used.
     """
     folder = Path(folder_path)
     if not folder.exists():
         logger.error("Folder does not exist: %s", folder_path)
-        return 1
+        return None
     
     if not folder.is_dir():
         logger.error("Path is not a directory: %s", folder_path)
-        return 1
+        return None
     
-    # Find all .txt files
-    txt_files = sorted(folder.glob("*.txt"))
+    txt_files = list_text_files(folder)
     if not txt_files:
         logger.warning("No .txt files found in %s", folder_path)
+    return txt_files
+
+
+def _find_collisions(folder_files: Dict[str, List[Path]]) -> Dict[str, List[str]]:
+    """
+    Return the doc_ids (file stems) that appear in more than one folder,
+    mapped to those folders; they would overwrite each other in the store.
+    """
+    folders_by_id: Dict[str, List[str]] = defaultdict(list)
+    for folder, txt_files in folder_files.items():
+        for file_path in txt_files:
+            folders_by_id[file_path.stem].append(folder)
+    return {doc_id: folders for doc_id, folders in folders_by_id.items() if len(folders) > 1}
+
+
+def ingest_documents_from_folder(folder_path: str, start: int = 1) -> int:
+    """
+    Load all .txt files from a folder and ingest them into the vector store,
+    numbering id_document from start.
+    """
+    txt_files = _list_folder(folder_path)
+    if txt_files is None:
+        return 1
+    return _ingest_folder_files(txt_files, start)
+
+
+def _ingest_folder_files(txt_files: List[Path], start: int) -> int:
+    """Ingest the listed files of one folder; returns 1 if any file failed."""
+    if not txt_files:
         return 0
     
     logger.info("Found %d documents to ingest", len(txt_files))
-    
-    ingested_count = 0
-    for idx, file_path in enumerate(txt_files, start=1):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-            
-            doc_id = file_path.stem
-            search_service.add_document(
-                doc_id=doc_id,
-                text=text,
-                id_document=idx,
-            )
-            logger.info("[%d/%d] Ingested: %s (%d chars)", idx, len(txt_files), doc_id, len(text))
-            ingested_count += 1
-        except Exception as exc:
-            logger.error("[%d/%d] Failed to ingest %s: %s", idx, len(txt_files), file_path.stem, exc)
-    
-    logger.info("Successfully ingested %d/%d documents", ingested_count, len(txt_files))
+    report = ingest_files(txt_files, start)
     
     # Check total count
     try:
@@ -61,9 +78,39 @@ def ingest_documents_from_folder(folder_path: str) -> int:
     except Exception as exc:
         logger.error("Failed to get collection count: %s", exc)
     
-    return 0 if ingested_count == len(txt_files) else 1
+    return 0 if report.ok else 1
+
+
+def main(folders: List[str]) -> int:
+    """
+    Ingest each folder in turn, sharing the loaded embedding model.
+    id_document keeps counting across folders, and the run is refused up front
+    if two folders contain files with the same name (the same doc_id).
+    Returns 1 if any folder failed.
+    """
+    folder_files: Dict[str, List[Path]] = {}
+    for folder in folders:
+        txt_files = _list_folder(folder)
+        if txt_files is None:
+            return 1
+        folder_files[folder] = txt_files
+
+    collisions = _find_collisions(folder_files)
+    if collisions:
+        for doc_id, colliding in sorted(collisions.items()):
+            logger.error("Document id %s appears in several folders: %s", doc_id, ", ".join(colliding))
+        logger.error("Refusing to ingest: %d document ids are not unique across folders", len(collisions))
+        return 1
+
+    exit_code = 0
+    start = 1
+    for folder, txt_files in folder_files.items():
+        logger.info("Starting ingestion from %s...", folder)
+        if _ingest_folder_files(txt_files, start) != 0:
+            exit_code = 1
+        start += len(txt_files)
+    return exit_code
+
 
 if __name__ == "__main__":
-    folder = "data/enzymes"
-    logger.info("Starting ingestion from %s...", folder)
-    sys.exit(ingest_documents_from_folder(folder))
+    sys.exit(main(sys.argv[1:] or ["data/enzymes"]))
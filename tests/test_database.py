@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("chromadb")
+
+from app.database import ChromaDatabase
+
+
+def _results(distances):
+    n = len(distances)
+    return {
+        "ids": [[f"doc{i}" for i in range(n)]],
+        "distances": [distances],
+        "metadatas": [[{"id_document": i} for i in range(n)]],
+        "documents": [[f"text {i}" for i in range(n)]],
+    }
+
+
+@pytest.mark.parametrize("space", ["ip", "cosine", "l2"])
+def test_identical_document_scores_one(space):
+    similarities = ChromaDatabase._to_similarities([0.0], space)
+    assert similarities[0] == pytest.approx(1.0)
+
+    formatted = ChromaDatabase._format_results(_results([0.0]), 0, space)
+    assert formatted[0]["score"] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize(
+    "space, distance, expected",
+    [
+        ("ip", 0.25, 0.75),
+        ("cosine", 0.25, 0.75),
+        # Squared L2 between unit vectors: d = 2 - 2 * cosine
+        ("l2", 0.5, 0.75),
+    ],
+)
+def test_distance_to_similarity(space, distance, expected):
+    assert ChromaDatabase._to_similarities([distance], space)[0] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("space", ["ip", "cosine", "l2"])
+def test_scores_are_clamped(space):
+    # Rounding can push ip/cosine distances slightly below 0; opposite vectors
+    # give distances beyond the [0, 1] similarity range
+    formatted = ChromaDatabase._format_results(_results([-1e-6, 5.0]), 0, space)
+    scores = [item["score"] for item in formatted]
+    assert scores[0] == pytest.approx(1.0)
+    assert scores[1] == 0.0
+    assert all(0.0 <= score <= 1.0 for score in scores)
+
+
+def test_format_results_keeps_rank_and_metadata():
+    formatted = ChromaDatabase._format_results(_results([0.1, 0.2]), 0, "ip")
+    assert [item["id"] for item in formatted] == [1, 2]
+    assert [item["doc_id"] for item in formatted] == ["doc0", "doc1"]
+    assert formatted[1]["metadata"] == {"id_document": 1}
+    assert formatted[1]["text"] == "text 1"
+    assert np.isclose(formatted[1]["score"], 0.8)